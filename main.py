@@ -1,76 +1,127 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import argparse
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
 import re
 import sys
 from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 import unicodedata
 
+import ahocorasick
+
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 CLEANED_DIR = BASE_DIR / "cleaned"
 KEYWORDS_DIR = BASE_DIR / "keywords"
 SUMMARY_PATH = BASE_DIR / "summary.txt"
 KEYWORDS_PATH = BASE_DIR / "keywords.txt"
-
-
-PUNCT_TRANSLATION = str.maketrans(
-    {
-        "，": ",",
-        "。": ".",
-        "：": ":",
-        "；": ";",
-        "？": "?",
-        "！": "!",
-        "（": "(",
-        "）": ")",
-        "【": "[",
-        "】": "]",
-        "《": "<",
-        "》": ">",
-        "“": '"',
-        "”": '"',
-        "‘": "'",
-        "’": "'",
-    }
+CACHE_PATH = BASE_DIR / ".cache.json"
+# 超过该大小的文件通过 mmap 直接解码，避免先复制出完整的 bytes
+MMAP_THRESHOLD = 64 * 1024
+
+
+PUNCT_MAP = {
+    "，": ",",
+    "。": ".",
+    "：": ":",
+    "；": ";",
+    "？": "?",
+    "！": "!",
+    "（": "(",
+    "）": ")",
+    "【": "[",
+    "】": "]",
+    "《": "<",
+    "》": ">",
+    "“": '"',
+    "”": '"',
+    "‘": "'",
+    "’": "'",
+}
+
+# 只匹配需要改写的空白：连续多个空白，或单个非空格的空白字符
+SPACE_RUN_RE = re.compile(r"\s{2,}|[^\S ]")
+# 一次扫描同时完成中文标点替换与空白合并
+PUNCT_OR_SPACE_RE = re.compile(
+    "[" + "".join(re.escape(c) for c in PUNCT_MAP) + r"]|\s{2,}|[^\S ]"
 )
+NON_WORD_RE = re.compile(r"[\s\W]+")
 
 
 def read_text(path: Path) -> str:
     encodings = ["utf-8", "utf-8-sig", "gb18030"]
-    for encoding in encodings:
-        try:
-            return path.read_text(encoding=encoding)
-        except UnicodeDecodeError:
-            continue
-    return path.read_text(encoding="utf-8", errors="ignore")
+    if path.stat().st_size < MMAP_THRESHOLD:
+        for encoding in encodings:
+            try:
+                return path.read_text(encoding=encoding)
+            except UnicodeDecodeError:
+                continue
+        return path.read_text(encoding="utf-8", errors="ignore")
+
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for encoding in encodings:
+            try:
+                return str(mm, encoding)
+            except UnicodeDecodeError:
+                continue
+        return str(mm, "utf-8", errors="ignore")
+
+
+def write_text(path: Path, text: str) -> None:
+    # 直接用 os.write 写入编码后的字节，绕过 open() 的文本/缓冲层
+    data = text.encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def to_nfkc(text: str) -> str:
+    # ASCII 文本已是 NFKC 形式
+    if text.isascii() or unicodedata.is_normalized("NFKC", text):
+        return text
+    return unicodedata.normalize("NFKC", text)
+
+
+def replace_punct_or_space(match: re.Match) -> str:
+    return PUNCT_MAP.get(match.group(), " ")
+
+
+def clean_line(line: str) -> str:
+    # 中文标点都不是 ASCII，ASCII 行只需合并空白，不必走回调
+    if line.isascii():
+        return SPACE_RUN_RE.sub(" ", line)
+    return PUNCT_OR_SPACE_RE.sub(replace_punct_or_space, line)
 
 
 def clean_text(text: str) -> str:
     if not text:
         return ""
-    text = unicodedata.normalize("NFKC", text)
-    text = text.translate(PUNCT_TRANSLATION)
-    lines = []
-    for line in text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        line = re.sub(r"\s+", " ", line)
-        lines.append(line)
-    cleaned = "\n".join(lines)
+    lines = (line.strip() for line in to_nfkc(text).splitlines())
+    cleaned = "\n".join(clean_line(line) for line in lines if line)
     return cleaned.lower()
 
 
 def normalize_for_match(text: str) -> str:
-    text = unicodedata.normalize("NFKC", text)
-    text = text.translate(PUNCT_TRANSLATION)
+    # 中文标点及其英文替换都会被 NON_WORD_RE 去掉，无需先做标点替换
+    text = to_nfkc(text)
     text = text.lower()
-    text = re.sub(r"[\s\W]+", "", text)
+    text = NON_WORD_RE.sub("", text)
     return text
 
 
-def load_keywords() -> list[str]:
+@lru_cache(maxsize=1)
+def load_keywords() -> tuple[str, ...]:
     if not KEYWORDS_PATH.exists():
         raise FileNotFoundError(f"keywords.txt not found at {KEYWORDS_PATH}")
     keywords = []
@@ -78,7 +129,7 @@ def load_keywords() -> list[str]:
         keyword = line.strip()
         if keyword:
             keywords.append(keyword)
-    return keywords
+    return tuple(keywords)
 
 
 def ensure_dirs() -> None:
@@ -86,40 +137,72 @@ def ensure_dirs() -> None:
     KEYWORDS_DIR.mkdir(exist_ok=True)
 
 
-def clean_all() -> None:
-    ensure_dirs()
-    for path in sorted(DATA_DIR.glob("*.txt")):
-        content = read_text(path)
-        cleaned = clean_text(content)
-        (CLEANED_DIR / path.name).write_text(cleaned, encoding="utf-8")
+def build_automaton(words: list[tuple[str, str]]) -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for pattern, keyword in words:
+        if not pattern:
+            continue
+        if pattern in automaton:
+            automaton.get(pattern).append(keyword)
+        else:
+            automaton.add_word(pattern, [keyword])
+    automaton.make_automaton()
+    return automaton
+
 
+def scan_automaton(automaton: ahocorasick.Automaton, text: str) -> set[str]:
+    found: set[str] = set()
+    if automaton.kind != ahocorasick.AHOCORASICK or not text:
+        return found
+    for _, keywords in automaton.iter(text):
+        found.update(keywords)
+    return found
 
-def match_keywords() -> dict[str, list[str]]:
+
+# 每个匹配进程各自持有的关键词与自动机，由 init_matcher 初始化
+_matcher: tuple[ahocorasick.Automaton, ahocorasick.Automaton] | None = None
+
+
+def init_matcher(keywords: tuple[str, ...]) -> None:
+    global _matcher
+    automaton = build_automaton([(kw.lower(), kw) for kw in keywords])
+    normalized_automaton = build_automaton(
+        [(normalize_for_match(kw), kw) for kw in keywords]
+    )
+    _matcher = (automaton, normalized_automaton)
+
+
+def process_one(path: Path) -> tuple[str, str, frozenset[str]]:
+    automaton, normalized_automaton = _matcher
+    cleaned = clean_text(read_text(path))
+    normalized_text = normalize_for_match(cleaned)
+    found_set = scan_automaton(automaton, cleaned)
+    found_set |= scan_automaton(normalized_automaton, normalized_text)
+    return path.stem, cleaned, frozenset(found_set)
+
+
+def process_all() -> dict[str, frozenset[str]]:
+    # 每个文件只从 data/ 读取一次，清洗与关键词匹配在同一进程内完成
     ensure_dirs()
     keywords = load_keywords()
-    matches_by_teacher: dict[str, list[str]] = {}
-    normalized_keywords = [(kw, normalize_for_match(kw)) for kw in keywords]
-
-    for path in sorted(CLEANED_DIR.glob("*.txt")):
-        text = path.read_text(encoding="utf-8")
-        normalized_text = normalize_for_match(text)
-        found = []
-        for keyword, normalized_keyword in normalized_keywords:
-            if keyword.lower() in text or (
-                normalized_keyword and normalized_keyword in normalized_text
-            ):
-                found.append(keyword)
-        matches_by_teacher[path.stem] = found
-        (KEYWORDS_DIR / path.name).write_text("\n".join(found), encoding="utf-8")
+    matches_by_teacher: dict[str, frozenset[str]] = {}
+    paths = sorted(DATA_DIR.glob("*.txt"))
+
+    with multiprocessing.Pool(initializer=init_matcher, initargs=(keywords,)) as pool:
+        for stem, cleaned, found in pool.imap_unordered(process_one, paths, chunksize=8):
+            matches_by_teacher[stem] = found
+            write_text(CLEANED_DIR / f"{stem}.txt", cleaned)
+            # 命中关键词按 keywords.txt 中的顺序写出
+            ordered = [keyword for keyword in keywords if keyword in found]
+            write_text(KEYWORDS_DIR / f"{stem}.txt", "\n".join(ordered))
     return matches_by_teacher
 
 
-def build_summary(matches_by_teacher: dict[str, list[str]]) -> str:
+def build_summary(matches_by_teacher: dict[str, frozenset[str]]) -> str:
     keywords = load_keywords()
     keyword_counts = Counter()
-    for _, matches in matches_by_teacher.items():
-        for keyword in set(matches):
-            keyword_counts[keyword] += 1
+    for matches in matches_by_teacher.values():
+        keyword_counts.update(matches)
 
     lines = ["[关键词命中统计]"]
     for keyword in keywords:
@@ -128,11 +211,11 @@ def build_summary(matches_by_teacher: dict[str, list[str]]) -> str:
     lines.append("")
     lines.append("[命中关键词最多的教师 Top3]")
     teacher_counts = {
-        teacher: len(set(matches)) for teacher, matches in matches_by_teacher.items()
+        teacher: len(matches) for teacher, matches in matches_by_teacher.items()
     }
-    top_teachers = sorted(
-        teacher_counts.items(), key=lambda item: (-item[1], item[0])
-    )[:3]
+    top_teachers = heapq.nsmallest(
+        3, teacher_counts.items(), key=lambda item: (-item[1], item[0])
+    )
     if top_teachers:
         for teacher, count in top_teachers:
             lines.append(f"{teacher}: {count}")
@@ -152,24 +235,75 @@ def build_summary(matches_by_teacher: dict[str, list[str]]) -> str:
     return "\n".join(lines) + "\n"
 
 
-def write_summary(matches_by_teacher: dict[str, list[str]]) -> None:
+def write_summary(matches_by_teacher: dict[str, frozenset[str]]) -> None:
     summary_text = build_summary(matches_by_teacher)
     SUMMARY_PATH.write_text(summary_text, encoding="utf-8")
 
 
-def run_pipeline() -> dict[str, list[str]]:
-    clean_all()
-    matches_by_teacher = match_keywords()
+def cache_key() -> list:
+    # 输入文件（名称与修改时间）、keywords.txt 与本程序均未变化时可复用上次结果；
+    # 计入 main.py 的修改时间，清洗/匹配规则改动后缓存自动失效。
+    # 用 list 而非 tuple，与从 JSON 读回的键可以直接比较
+    data_files = [
+        [path.name, path.stat().st_mtime_ns] for path in sorted(DATA_DIR.glob("*.txt"))
+    ]
+    return [
+        data_files,
+        KEYWORDS_PATH.stat().st_mtime_ns,
+        Path(__file__).stat().st_mtime_ns,
+    ]
+
+
+def load_cache(key: list) -> dict[str, frozenset[str]] | None:
+    # 缓存文件缺失、损坏或格式不符都视为未命中
+    try:
+        cached = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        if cached["key"] != key:
+            return None
+        matches_by_teacher = {
+            teacher: frozenset(matches)
+            for teacher, matches in cached["matches_by_teacher"].items()
+        }
+    except Exception:
+        return None
+    # 输出文件被删除时需要重新生成
+    for teacher in matches_by_teacher:
+        name = f"{teacher}.txt"
+        if not ((CLEANED_DIR / name).is_file() and (KEYWORDS_DIR / name).is_file()):
+            return None
+    return matches_by_teacher
+
+
+def save_cache(key: list, matches_by_teacher: dict[str, frozenset[str]]) -> None:
+    cached = {
+        "key": key,
+        "matches_by_teacher": {
+            teacher: sorted(matches) for teacher, matches in matches_by_teacher.items()
+        },
+    }
+    # 先写临时文件再替换，中断时不会留下写了一半的缓存
+    tmp_path = CACHE_PATH.with_name(CACHE_PATH.name + ".tmp")
+    write_text(tmp_path, json.dumps(cached, ensure_ascii=False))
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def run_pipeline() -> dict[str, frozenset[str]]:
+    # 先读取关键词，keywords.txt 缺失时给出明确的报错
+    load_keywords()
+    key = cache_key()
+    matches_by_teacher = load_cache(key)
+    if matches_by_teacher is None:
+        matches_by_teacher = process_all()
+        save_cache(key, matches_by_teacher)
     write_summary(matches_by_teacher)
     return matches_by_teacher
 
 
-def list_keywords(matches_by_teacher: dict[str, list[str]]) -> None:
+def list_keywords(matches_by_teacher: dict[str, frozenset[str]]) -> None:
     keywords = load_keywords()
     counts = Counter()
     for matches in matches_by_teacher.values():
-        for keyword in set(matches):
-            counts[keyword] += 1
+        counts.update(matches)
     ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
     for keyword in keywords:
         if keyword not in counts:
@@ -180,7 +314,9 @@ def list_keywords(matches_by_teacher: dict[str, list[str]]) -> None:
         print(f"{keyword}: {count}")
 
 
-def search_keyword(keyword: str, matches_by_teacher: dict[str, list[str]]) -> None:
+def search_keyword(
+    keyword: str, matches_by_teacher: dict[str, frozenset[str]]
+) -> None:
     teachers = sorted(
         [teacher for teacher, matches in matches_by_teacher.items() if keyword in matches]
     )
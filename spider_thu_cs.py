@@ -6,41 +6,107 @@
   python spider_thu_cs.py
 """
 
+from __future__ import annotations
+
 import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lx
+from requests.adapters import HTTPAdapter
 
 
 BASE = "https://www.cs.tsinghua.edu.cn/"
 LIST_URL = "https://www.cs.tsinghua.edu.cn/szzk/jzgml.htm"
 
+_RE_WS = re.compile(r"\s+")
+_RE_UNSAFE_FN = re.compile(r'[\\/:*?"<>|]+')
+_RE_XML_DECL = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+# lxml 解析器在线程间共享会串行化，每个线程各建一个并重复使用
+_parser_local = threading.local()
+
+# 可能出现的栏目标题（停止条件）
+_STOP_TITLES = frozenset({
+    "教育背景", "工作经历", "社会兼职", "学术兼职", "奖励与荣誉", "荣誉奖励",
+    "学术成果", "科研项目", "代表性论文", "代表论文", "出版物", "专利",
+    "招生信息", "教学", "课程", "联系方式", "邮箱", "电话", "上一篇", "下一篇", "关闭"
+})
+
+# 需要抽取的栏目标题（按输出顺序）
+_TARGET_TITLES = ("研究领域", "研究方向", "研究概况")
+_TARGET_SET = frozenset(_TARGET_TITLES)
+
+# 标题行末尾可能带的冒号与空白
+_TITLE_STRIP = "：: \t"
+
 
 def _safe_filename(name: str) -> str:
     """把姓名变成安全文件名（Windows 不允许的字符去掉）"""
     name = name.strip()
-    name = re.sub(r'[\\/:*?"<>|]+', "_", name)
+    name = _RE_UNSAFE_FN.sub("_", name)
     return name
 
 
+def _is_cn_name(s: str) -> bool:
+    """判断是否为 2~10 个字符、仅由常用汉字（U+4E00~U+9FFF）和“·”组成的姓名"""
+    return 2 <= len(s) <= 10 and all("\u4e00" <= c <= "\u9fff" or c == "·" for c in s)
+
+
+def _html_parser() -> lx.HTMLParser:
+    """返回当前线程复用的 HTML 解析器"""
+    parser = getattr(_parser_local, "parser", None)
+    if parser is None:
+        parser = lx.HTMLParser(recover=True, huge_tree=False)
+        _parser_local.parser = parser
+    return parser
+
+
+def _parse_html(html: str) -> lx.HtmlElement | None:
+    """解析 HTML 文本；空页面等无法解析的内容返回 None"""
+    # lxml 不接受带编码声明的 str，文本已解码，去掉声明即可
+    html = _RE_XML_DECL.sub("", html, count=1)
+    try:
+        return lx.fromstring(html, parser=_html_parser())
+    except (etree.ParserError, ValueError):
+        return None
+
+
 def _clean_lines(text: str) -> list[str]:
     """把页面文本做成干净的行列表（去空行/多空格）"""
     text = text.replace("\xa0", " ")
-    lines = [re.sub(r"\s+", " ", x).strip() for x in text.splitlines()]
+    lines = (_RE_WS.sub(" ", x).strip() for x in text.splitlines())
     return [x for x in lines if x]
 
 
+def _decode_response(resp: requests.Response) -> str:
+    """
+    按响应头声明的编码解码（未声明时按 utf-8）；
+    只有解码失败时才用 apparent_encoding（chardet 需扫描整个响应体，较慢）
+    """
+    content = resp.content
+    if content.isascii():
+        return content.decode("ascii")
+    if "charset" not in resp.headers.get("Content-Type", "").lower():
+        resp.encoding = "utf-8"
+    try:
+        return content.decode(resp.encoding)
+    except (UnicodeDecodeError, LookupError):
+        return content.decode(resp.apparent_encoding or "utf-8", errors="replace")
+
+
 def fetch_html(session: requests.Session, url: str, timeout: int = 20) -> str:
     """抓取网页 HTML，带基本重试"""
     for attempt in range(3):
         try:
             resp = session.get(url, timeout=timeout)
             resp.raise_for_status()
-            resp.encoding = resp.apparent_encoding or "utf-8"
-            return resp.text
+            return _decode_response(resp)
         except Exception as e:
             if attempt == 2:
                 raise
@@ -53,38 +119,28 @@ def parse_teacher_links(list_html: str) -> list[tuple[str, str]]:
     从名录页提取教师(姓名, 个人页URL)
     名录页里链接一般是 /info/xxxx/yyyy.htm
     """
-    soup = BeautifulSoup(list_html, "lxml")
+    doc = _parse_html(list_html)
+    if doc is None:
+        return []
     pairs: list[tuple[str, str]] = []
 
-    # 找所有 <a>，过滤出文本是姓名、href 指向 info 页的
-    for a in soup.find_all("a"):
-        name = a.get_text(strip=True)
+    # XPath 直接筛出 href 指向 info 页的 <a>，再过滤出文本是姓名的
+    for a in doc.xpath("//a[contains(@href, '/info/')]"):
+        name = "".join(x.strip() for x in a.xpath(".//text()"))
         href = a.get("href", "").strip()
 
         if not name:
             continue
-        if not href:
-            continue
-        if "/info/" not in href:
-            continue
 
         # 姓名一般是纯中文 2~4 个字（也可能更长，但这里先放宽一点）
-        if not re.fullmatch(r"[\u4e00-\u9fff·]{2,10}", name):
+        if not _is_cn_name(name):
             continue
 
         full_url = urljoin(BASE, href)
         pairs.append((name, full_url))
 
-    # 去重（同名同链接）
-    seen = set()
-    uniq = []
-    for name, url in pairs:
-        key = (name, url)
-        if key in seen:
-            continue
-        seen.add(key)
-        uniq.append((name, url))
-    return uniq
+    # 去重（同名同链接），dict 保留首次出现的顺序
+    return list(dict.fromkeys(pairs))
 
 
 def extract_research_text(profile_html: str) -> str:
@@ -95,41 +151,41 @@ def extract_research_text(profile_html: str) -> str:
     - 研究概况
     做法：把页面转纯文本后，按“标题行”截取后续内容直到遇到下一个栏目标题。
     """
-    soup = BeautifulSoup(profile_html, "lxml")
+    doc = _parse_html(profile_html)
+    if doc is None:
+        return ""
 
     # 整页转文本（不要太聪明：很多站点结构不固定，硬找 div class 反而脆）
-    raw_text = soup.get_text("\n", strip=True)
+    # 与 BeautifulSoup 的 get_text 一致，清空 script/style 的内容再遍历文本节点；
+    # 只清空不删除元素，保证其后的 tail 文本仍是独立的一行
+    for el in list(doc.iter("script", "style")):
+        el.text = None
+        del el[:]
+    raw_text = "\n".join(x.strip() for x in doc.itertext() if x.strip())
     lines = _clean_lines(raw_text)
 
-    # 可能出现的栏目标题（停止条件）
-    stop_titles = {
-        "教育背景", "工作经历", "社会兼职", "学术兼职", "奖励与荣誉", "荣誉奖励",
-        "学术成果", "科研项目", "代表性论文", "代表论文", "出版物", "专利",
-        "招生信息", "教学", "课程", "联系方式", "邮箱", "电话", "上一篇", "下一篇", "关闭"
+    # 建一个“标题 -> (抽取内容, 已出现的行)”的字典，集合用于 O(1) 去重
+    sections: dict[str, tuple[list[str], set[str]]] = {
+        t: ([], set()) for t in _TARGET_TITLES
     }
 
-    target_titles = ["研究领域", "研究方向", "研究概况"]
-
-    # 建一个“标题 -> 抽取内容”的字典
-    sections: dict[str, list[str]] = {t: [] for t in target_titles}
-
     i = 0
     while i < len(lines):
         line = lines[i]
 
         # 有时标题带冒号，比如“研究领域：”
-        normalized = re.sub(r"[：:]\s*$", "", line)
+        normalized = line.rstrip(_TITLE_STRIP)
 
-        if normalized in sections:
+        if normalized in _TARGET_SET:
             title = normalized
             i += 1
             buf = []
             while i < len(lines):
                 nxt = lines[i]
-                nxt_norm = re.sub(r"[：:]\s*$", "", nxt)
+                nxt_norm = nxt.rstrip(_TITLE_STRIP)
 
                 # 碰到另一个栏目标题就停
-                if (nxt_norm in stop_titles) or (nxt_norm in target_titles):
+                if nxt_norm in _STOP_TITLES or nxt_norm in _TARGET_SET:
                     break
 
                 # 一些噪声行过滤（可按需加规则）
@@ -141,17 +197,19 @@ def extract_research_text(profile_html: str) -> str:
                 i += 1
 
             # 合并去重（同一段落可能被页面重复输出）
+            content, seen = sections[title]
             for x in buf:
-                if x not in sections[title]:
-                    sections[title].append(x)
+                if x not in seen:
+                    seen.add(x)
+                    content.append(x)
             continue
 
         i += 1
 
     # 组装输出：只要命中任何一个栏目就输出
     out_parts = []
-    for t in target_titles:
-        content = sections[t]
+    for t in _TARGET_TITLES:
+        content, _ = sections[t]
         if content:
             out_parts.append(t)
             out_parts.extend(content)
@@ -166,15 +224,77 @@ def extract_research_text(profile_html: str) -> str:
     return result
 
 
-def crawl_to_data(output_dir: str = "data", sleep_sec: float = 0.2) -> None:
+class _RateLimiter:
+    """所有线程共享：相邻两次请求的发起时间至少间隔 interval 秒"""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def save_teacher(session: requests.Session, limiter: _RateLimiter, name: str,
+                 url: str, output_dir: str) -> str:
+    """抓取单个教师个人页并写入 output_dir/姓名.txt，返回文件路径；未提取到文本返回空串"""
+    limiter.wait()
+    html = fetch_html(session, url)
+    research_text = extract_research_text(html)
+    if not research_text:
+        return ""
+
+    fn = _safe_filename(name) + ".txt"
+    path = os.path.join(output_dir, fn)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(research_text)
+    return path
+
+
+def save_teachers(session: requests.Session, limiter: _RateLimiter,
+                  entries: list[tuple[str, str]],
+                  output_dir: str) -> list[tuple[str, str, Exception | None]]:
+    """
+    依次抓取写入同一个文件名的教师（同名不同链接），保证与串行抓取一样由靠后的条目覆盖；
+    返回每位教师的 (姓名, 文件路径或空串, 异常或 None)
+    """
+    results: list[tuple[str, str, Exception | None]] = []
+    for name, url in entries:
+        try:
+            path = save_teacher(session, limiter, name, url, output_dir)
+        except Exception as e:
+            results.append((name, "", e))
+            continue
+        results.append((name, path, None))
+    return results
+
+
+def crawl_to_data(output_dir: str = "data", sleep_sec: float = 0.2,
+                  max_workers: int = 8) -> None:
+    """
+    并发抓取所有教师个人页并写入 output_dir。
+    sleep_sec 是全部线程共享的请求间隔：整体请求速率不超过每 sleep_sec 秒一次，
+    与串行抓取时相同；max_workers 只用于让多个请求的网络等待相互重叠。
+    """
     os.makedirs(output_dir, exist_ok=True)
 
     session = requests.Session()
     session.headers.update({
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                       "AppleWebKit/537.36 (KHTML, like Gecko) "
-                      "Chrome/120.0 Safari/537.36"
+                      "Chrome/120.0 Safari/537.36",
+        "Accept-Encoding": "gzip, deflate",
     })
+    # 连接池与线程数一致，各线程复用 keep-alive 连接
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
 
     print(f"【开始】抓取教师名录：{LIST_URL}")
     list_html = fetch_html(session, LIST_URL)
@@ -184,30 +304,39 @@ def crawl_to_data(output_dir: str = "data", sleep_sec: float = 0.2) -> None:
     saved = 0
     skipped = 0
 
-    for idx, (name, url) in enumerate(teachers, 1):
-        try:
-            html = fetch_html(session, url)
-            research_text = extract_research_text(html)
-
-            if not research_text:
-                skipped += 1
-                print(f"[{idx}/{len(teachers)}] {name}：未提取到研究相关文本，跳过")
-                time.sleep(sleep_sec)
-                continue
-
-            fn = _safe_filename(name) + ".txt"
-            path = os.path.join(output_dir, fn)
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(research_text)
-
-            saved += 1
-            print(f"[{idx}/{len(teachers)}] {name}：已保存 -> {path}")
+    # 按输出文件名分组：同名教师放在同一个任务里按名录顺序处理，避免多个线程同时写同一文件
+    groups: dict[str, list[tuple[str, str]]] = {}
+    for name, url in teachers:
+        groups.setdefault(_safe_filename(name), []).append((name, url))
+
+    limiter = _RateLimiter(sleep_sec)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [
+        executor.submit(save_teachers, session, limiter, entries, output_dir)
+        for entries in groups.values()
+    ]
+    try:
+        idx = 0
+        for future in as_completed(futures):
+            for name, path, error in future.result():
+                idx += 1
+                if error is not None:
+                    skipped += 1
+                    print(f"[{idx}/{len(teachers)}] {name}：抓取失败，原因：{error}")
+                    continue
 
-        except Exception as e:
-            skipped += 1
-            print(f"[{idx}/{len(teachers)}] {name}：抓取失败，原因：{e}")
+                if not path:
+                    skipped += 1
+                    print(f"[{idx}/{len(teachers)}] {name}：未提取到研究相关文本，跳过")
+                    continue
 
-        time.sleep(sleep_sec)
+                saved += 1
+                print(f"[{idx}/{len(teachers)}] {name}：已保存 -> {path}")
+    except BaseException:
+        # Ctrl-C 等中断时取消尚未开始的任务，不等待剩余页面抓完
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
 
     print(f"【完成】成功保存：{saved}，跳过/失败：{skipped}，输出目录：{output_dir}")
 
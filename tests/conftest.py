@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 把仓库根目录加入 sys.path，无论从哪里运行 pytest 都能 import main / spider_thu_cs
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,49 @@
+import spider_thu_cs as spider
+
+
+def test_extract_keeps_text_after_inline_script_separate():
+    html = (
+        "<html><body>研究方向<script>x()</script>分布式系统与高性能计算"
+        "<h3>联系方式</h3></body></html>"
+    )
+    assert spider.extract_research_text(html) == "研究方向\n分布式系统与高性能计算"
+
+
+def test_extract_drops_script_and_style_content():
+    html = (
+        "<html><body><h3>研究领域</h3><p>图像处理与分析<script>var a = 1;</script>"
+        "模式识别方向研究</p><style>p {}</style><h3>教育背景</h3></body></html>"
+    )
+    assert spider.extract_research_text(html) == "研究领域\n图像处理与分析\n模式识别方向研究"
+
+
+def test_parse_teacher_links_accepts_xml_declaration():
+    html = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<html><body><a href="/info/1/101.htm">张三</a></body></html>'
+    )
+    assert spider.parse_teacher_links(html) == [
+        ("张三", "https://www.cs.tsinghua.edu.cn/info/1/101.htm")
+    ]
+
+
+def test_empty_pages_return_empty_results():
+    for html in ("", "   \n"):
+        assert spider.parse_teacher_links(html) == []
+        assert spider.extract_research_text(html) == ""
+
+
+def test_crawl_homonyms_later_entry_wins(tmp_path, monkeypatch):
+    links = "".join(
+        f'<a href="/info/1/{i}.htm">张三</a>' for i in range(1, 6)
+    )
+    pages = {spider.LIST_URL: f"<html><body>{links}</body></html>"}
+    for i in range(1, 6):
+        url = f"https://www.cs.tsinghua.edu.cn/info/1/{i}.htm"
+        pages[url] = f"<html><body><h3>研究方向</h3><p>第{i}位老师的研究内容</p></body></html>"
+    monkeypatch.setattr(spider, "fetch_html", lambda session, url: pages[url])
+
+    spider.crawl_to_data(output_dir=str(tmp_path), sleep_sec=0, max_workers=4)
+
+    assert [p.name for p in tmp_path.iterdir()] == ["张三.txt"]
+    assert (tmp_path / "张三.txt").read_text(encoding="utf-8") == "研究方向\n第5位老师的研究内容"